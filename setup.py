@@ -1,8 +1,20 @@
+import os
 import setuptools
 
 with open("README.md", "r") as fh:
     long_description = fh.read()
 
+# Setting DJANGO_PARAM_VALIDATOR_MYPYC compiles the validator into a C
+# extension with mypyc.  The Python module is installed either way, and is
+# used if the extension isn't present.
+ext_modules = []
+if os.environ.get("DJANGO_PARAM_VALIDATOR_MYPYC"):
+    from mypyc.build import mypycify
+    ext_modules = mypycify([
+        "--ignore-missing-imports",
+        "src/django_param_validator/validator.py",
+    ])
+
 setuptools.setup(
     name="django_param_validator",
     packages=setuptools.find_packages('src'),
@@ -15,10 +27,15 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/PaulWay/django-param-validator",
-    packages=setuptools.find_packages(),
+    ext_modules=ext_modules,
+    install_requires=[
+        "Django>=3.2",
+        "djangorestframework",
+        "drf-yasg",
+    ],
     classifiers=[
         'Development Status :: 3 - Alpha',
-        "Framework :: Django :: 2.1",
+        "Framework :: Django :: 3.2",
         "License :: OSI Approved :: GNU General Public License v3 (GPLv3)",
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3",
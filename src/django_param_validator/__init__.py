@@ -0,0 +1,4 @@
+from .validator import (
+    InvalidParameterDefinition, ParamSpec, build_validator, filter_on_param,
+    validate_all, value_of_param,
+)
@@ -3,124 +3,502 @@ django_param_validate - validate query parameters according to their
 OpenAPI definitions.
 """
 
-from datetime import datetime
+from datetime import date, datetime
+from django.core.exceptions import BadRequest
+from django.db.models import Q
 from django.utils.dateparse import parse_date, parse_datetime
-from django.utils timezone import make_aware
+from django.utils.timezone import get_current_timezone, is_naive
 from drf_yasg import openapi
+import functools
 import re
+from rest_framework.request import Request
+from typing import (
+    Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional,
+    Pattern, Tuple, Type, Union,
+)
+
+# pytz timezones (the default before Django 4) raise an InvalidTimeError for
+# local times that don't exist or are ambiguous; zoneinfo timezones never do.
+try:
+    from pytz.exceptions import InvalidTimeError
+    _INVALID_TIME_ERRORS: Tuple[Type[Exception], ...] = (InvalidTimeError,)
+except ImportError:
+    _INVALID_TIME_ERRORS = ()
+
+# Numba is optional: if it's installed, arrays of integers are parsed and
+# checked in bulk, otherwise each item is validated in Python.  It and numpy
+# are only imported when they're first needed - see _integer_array_kernel.
+numpy: Any = None
+
+# A parameter, or the definition of the items in an array parameter
+Definition = Union[openapi.Parameter, openapi.Items]
+
+# Validators are called with the parameter name and the value to validate,
+# and return the value converted to its Python type.
+Validator = Callable[[str, Any], Any]
+
+# Extractors get the raw value of a parameter from the request.
+Extractor = Callable[[openapi.Parameter, Request], Any]
 
 
 class InvalidParameterDefinition(Exception):
     pass
 
 
-def _validate_part(name, param, value):
+# Values of a boolean parameter that are taken as true; anything else is false
+_BOOL_TRUE = frozenset(('true', '1', 'yes', 'on', 'True', 'TRUE', 'YES'))
+
+_NUMBER_RE = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+_SPLITTER_FOR = {'csv': ',', 'ssv': ' ', 'tsv': '\t', 'pipes': '|'}
+
+
+@functools.lru_cache(maxsize=1024)
+def _compiled(pattern: str) -> Pattern[str]:
     """
-    Validate a parameter, or an item in a parameter.  Items can have the same
-    validation requirements as parameters, possibly recursively, so we handle
-    that possible recursion, as well as all validation, here.
+    Compile a parameter's pattern, caching the result so that each pattern
+    is only compiled once however many parameters use it.  Validators
+    compile their patterns when they are built, so a bad pattern is reported
+    then rather than when a request arrives.
+    """
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        raise InvalidParameterDefinition(
+            f"Parameter pattern '{pattern}' is not a valid regular expression: {e}"
+        )
+
+
+def _to_integer(name: str, value: Any) -> int:
+    # Path converters and JSON bodies can give us an integer already.
+    if type(value) is int:
+        return value
+    # Check the digits directly rather than relying on int() to raise an
+    # exception, which is slow and accepts things like '1_000' and ' 1 '.
+    # Most values are plain unsigned numbers, which need only one check.
+    if isinstance(value, str):
+        if value.isdecimal():
+            return int(value)
+        digits = value[1:] if value[:1] in ('-', '+') else value
+        if digits.isdecimal():
+            return int(value)
+    raise ValueError(
+        f"The value for the '{name}' field must be an integer"
+    )
+
+
+def _to_number(name: str, value: Any) -> float:
+    if type(value) in (int, float):
+        return float(value)
+    if isinstance(value, str) and (
+        value.isdecimal() or _NUMBER_RE.fullmatch(value)
+    ):
+        return float(value)
+    raise ValueError(
+        f"The value for the '{name}' field must be a floating point number"
+    )
 
-    Validations we do:
 
-    * Integers must be able to be converted into an integer.
-    * Enums must have the value in the parameter's enum list.
+def _make_aware(moment: datetime) -> datetime:
     """
-    # Parse arrays by splitting them and recursively validating the values.
-    if param.type == openapi.TYPE_ARRAY:
-        # Split value into parts and recursively validate them
-        collection_format = getattr(param, 'collectionFormat', None)
-        if not collection_format:
-            raise InvalidParameterDefinition(
-                "Array parameter collection format not defined"
-            )
-        splitter_for = {'csv': ',', 'ssv': ' ', 'tsv': '\t', 'pipes': '|'}
-        values = []
-        if collection_format in splitter_for:
-            values = value.split(splitter_for[collection_format])
-        elif collection_format == 'multi':
-            # No idea if Django handles multiple arguments by putting them
-            # into an array itself, but let's start with this idea
-            values = value
-        else:
-            raise InvalidParameterDefinition(
-                f"Array parameter collection format {collection_format} not recognised"
-            )
-        if param.items_ is None:
-            raise InvalidParameterDefinition(
-                "Array parameter has not defined the type of its items"
-            )
-        return [validate_param_part(name, param.items_, v) for v in values]
+    Make a naive datetime aware in the current timezone.  This does what
+    Django's make_aware does by default, without checking again that the
+    datetime is naive: with a pytz timezone, a local time that doesn't exist
+    or is ambiguous raises one of _INVALID_TIME_ERRORS.  The timezone isn't
+    cached, because it can be changed for each thread with
+    django.utils.timezone.activate().
+    """
+    tz = get_current_timezone()
+    if hasattr(tz, 'localize'):
+        # pytz timezones need localize() to get the right offset
+        aware: datetime = tz.localize(moment, is_dst=None)
+        return aware
+    return moment.replace(tzinfo=tz)
 
-    # Handle any Pythonic type conversions first
-    if param.type == openapi.TYPE_BOOLEAN:
-        # Booleans don't do any further processing, so exit now
-        return value in ('true', '1', 'yes')
 
-    elif param.type == openapi.TYPE_INTEGER:
+def _to_date(name: str, value: Any) -> datetime:
+    # Most dates arrive in ISO format, which the standard library parses far
+    # faster than Django's regex-based parser; only fall back to that if we
+    # have to.  Values that aren't strings, e.g. numbers from a JSON body,
+    # aren't dates.
+    day = None
+    if isinstance(value, str):
         try:
-            value = int(value)
+            day = date.fromisoformat(value)
         except ValueError:
-            raise ValueError(
-                f"The value for the '{name}' field must be an integer"
-            )
-    elif param.type == openapi.TYPE_NUMBER:
-        try:
-            value = float(value)
-        except ValueError:
-            raise ValueError(
-                f"The value for the '{name}' field must be a floating point number"
-            )
-    elif param.type == openapi.TYPE_STRING:
-        # Check string pattern and format possibilities.
-        pattern = getattr(param, 'pattern', None)
-        if pattern:
-            if not re.match(pattern, value):
-                raise BadRequest(
-                    f"The value of the '{name}' field did not match the "
-                    f"pattern '{pattern}'"
-                )
-        param_format = getattr(param, 'format', 'NONE')
-        if param_format == openapi.FORMAT_DATE:
             try:
-                # datetime.date objects cannot be timezone aware, so they
-                # have to be converted into datetimes.  Haven't found a better
-                # way of doing this:
-                value = make_aware(datetime.fromordinal(parse_date(value).toordinal()))
+                day = parse_date(value)
             except ValueError:
-                raise BadRequest(
-                    f"The value for the '{name}' field did not look like a date"
-                )
-        elif param_format == openapi.FORMAT_DATETIME:
+                pass
+    if day is not None:
+        # datetime.date objects cannot be timezone aware, so they have to be
+        # converted into datetimes at midnight.
+        try:
+            return _make_aware(datetime(day.year, day.month, day.day))
+        except _INVALID_TIME_ERRORS:
+            pass
+    raise BadRequest(
+        f"The value for the '{name}' field did not look like a date"
+    )
+
+
+def _to_datetime(name: str, value: Any) -> datetime:
+    moment = None
+    if isinstance(value, str):
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
             try:
-                value = make_aware(parse_datetime(value))
+                moment = parse_datetime(value)
             except ValueError:
+                pass
+    if moment is not None:
+        # Datetimes given with an offset are already aware.
+        try:
+            return _make_aware(moment) if is_naive(moment) else moment
+        except _INVALID_TIME_ERRORS:
+            pass
+    raise BadRequest(
+        f"The value for the '{name}' field did not look like a datetime"
+    )
+
+
+def _first_not_in_enum(values: Any, enum_values: Any) -> int:
+    """
+    Return the index of the first of the values that is not in the
+    (sorted) enum values, or -1 if they all are.  This is compiled by Numba,
+    which works out its own types for the numpy arrays it's given.
+    """
+    for i in range(values.shape[0]):
+        j = numpy.searchsorted(enum_values, values[i])
+        if j == enum_values.shape[0] or enum_values[j] != values[i]:
+            return i
+    return -1
+
+
+@functools.lru_cache(maxsize=None)
+def _integer_array_kernel() -> Optional[Callable[[Any, Any], int]]:
+    """
+    Return the Numba-compiled version of _first_not_in_enum, or None if
+    numpy or Numba are not installed.  Importing Numba takes a significant
+    time and memory, so this is only done when the first validator for an
+    array of integers is built, not when this module is imported.
+    """
+    global numpy
+    # When this module is compiled by mypyc, _first_not_in_enum is no longer
+    # a Python function that Numba can compile.
+    if not hasattr(_first_not_in_enum, '__code__'):
+        return None
+    try:
+        from numba import njit
+        import numpy
+    except ImportError:
+        return None
+    return njit(cache=True)(_first_not_in_enum)
+
+
+class ParamSpec(NamedTuple):
+    """
+    The details of a parameter, or an item in a parameter, that are used to
+    validate it.  These are read from the OpenAPI definition once, so
+    building the validator never has to probe the definition for its
+    optional attributes again.
+    """
+    type: str
+    format: Optional[str] = None
+    pattern: Optional[Pattern[str]] = None
+    enum: Optional[Tuple[Any, ...]] = None
+    enum_set: Optional[FrozenSet[Any]] = None
+    collection_format: Optional[str] = None
+    items: Optional['ParamSpec'] = None
+
+    @classmethod
+    def from_param(cls, param: Definition) -> 'ParamSpec':
+        """
+        Read the spec from an OpenAPI Parameter or Items object, including
+        the spec for its items if it has them.
+        """
+        pattern = getattr(param, 'pattern', None)
+        enum = getattr(param, 'enum', None)
+        items = getattr(param, 'items_', None)
+        return cls(
+            type=param.type,
+            format=getattr(param, 'format', None),
+            pattern=None if pattern is None else _compiled(pattern),
+            enum=None if enum is None else tuple(enum),
+            enum_set=None if enum is None else frozenset(enum),
+            collection_format=getattr(param, 'collectionFormat', None),
+            items=None if items is None else cls.from_param(items),
+        )
+
+
+def _build_integer_array_validator(
+    items: ParamSpec, separator: str, item_validator: Validator
+) -> Optional[Validator]:
+    """
+    Return a validator for an array of plain integers which parses and checks
+    the whole array at once using numpy and Numba, or None if that isn't
+    possible.  Any value the fast path can't accept is handed to the item
+    validator, so errors are reported exactly as they would be otherwise.
+    """
+    if items.pattern is not None:
+        return None
+    first_not_in_enum = _integer_array_kernel()
+    if first_not_in_enum is None:
+        return None
+    enum = items.enum
+    enum_values = None
+    if enum is not None:
+        # Enums with values that aren't integers, or don't fit in 64 bits,
+        # are left to the Python path.
+        limits = numpy.iinfo(numpy.int64)
+        if not all(type(e) is int and limits.min <= e <= limits.max for e in enum):
+            return None
+        enum_values = numpy.array(sorted(enum), dtype=numpy.int64)
+    # Only hand numpy values it will parse completely and that fit in 64 bits
+    number = r'[-+]?[0-9]{1,18}'
+    well_formed = re.compile(f'{number}(?:{re.escape(separator)}{number})*')
+
+    def validate_array(name: str, value: str) -> List[Any]:
+        if well_formed.fullmatch(value):
+            values = numpy.fromstring(value, dtype=numpy.int64, sep=separator)
+            if enum_values is None or first_not_in_enum(values, enum_values) < 0:
+                result: List[Any] = values.tolist()
+                return result
+        return [item_validator(name, v) for v in value.split(separator)]
+
+    return validate_array
+
+
+def _build_array_validator(spec: ParamSpec) -> Validator:
+    if spec.items is None:
+        raise InvalidParameterDefinition(
+            "Array parameter has not defined the type of its items"
+        )
+    # The collection format decides how the value is split into parts, each
+    # of which is then validated with the validator for the array's items.
+    collection_format = spec.collection_format
+    if not collection_format:
+        raise InvalidParameterDefinition(
+            "Array parameter collection format not defined"
+        )
+    item_validator = _build_validator(spec.items)
+    if collection_format in _SPLITTER_FOR:
+        separator = _SPLITTER_FOR[collection_format]
+        if spec.items.type == openapi.TYPE_INTEGER:
+            validator = _build_integer_array_validator(
+                spec.items, separator, item_validator
+            )
+            if validator is not None:
+                return validator
+        return lambda name, value: [
+            item_validator(name, v) for v in value.split(separator)
+        ]
+    if collection_format == 'multi':
+        # The value is already a list of the arguments given for the
+        # parameter, which value_of_param gets from the query.
+        return lambda name, value: [item_validator(name, v) for v in value]
+    raise InvalidParameterDefinition(
+        f"Array parameter collection format {collection_format} not recognised"
+    )
+
+
+def _build_boolean_validator(spec: ParamSpec) -> Validator:
+    # Booleans don't do any further processing, so their validator is simple.
+    # JSON bodies can give us a boolean already.
+    return lambda name, value: (
+        value is True or (isinstance(value, str) and value in _BOOL_TRUE)
+    )
+
+
+def _string_conversions(spec: ParamSpec) -> List[Validator]:
+    # Check string format possibilities.  Patterns are checked for all
+    # types, in _build_validator.
+    # We don't check any of the other formats here (yet).
+    if spec.format in _FORMAT_CONVERSIONS:
+        return [_FORMAT_CONVERSIONS[spec.format]]
+    return []
+
+
+# Types whose validators are built completely by their own function, e.g.
+# arrays split their value and validate each part with the validator built
+# for their items.
+_TYPE_VALIDATORS: Dict[str, Callable[[ParamSpec], Validator]] = {
+    openapi.TYPE_ARRAY: _build_array_validator,
+    openapi.TYPE_BOOLEAN: _build_boolean_validator,
+}
+
+# For other types, the functions that give the first steps in validating
+# the value, usually converting it into a Python type.
+_TYPE_CONVERSIONS: Dict[str, Callable[[ParamSpec], List[Validator]]] = {
+    openapi.TYPE_INTEGER: lambda spec: [_to_integer],
+    openapi.TYPE_NUMBER: lambda spec: [_to_number],
+    openapi.TYPE_STRING: _string_conversions,
+}
+
+_FORMAT_CONVERSIONS: Dict[str, Validator] = {
+    openapi.FORMAT_DATE: _to_date,
+    openapi.FORMAT_DATETIME: _to_datetime,
+}
+
+
+def _build_validator(spec: ParamSpec) -> Validator:
+    """
+    Construct the validator function for a parameter's spec - see
+    build_validator.
+    """
+    if spec.type in _TYPE_VALIDATORS:
+        return _TYPE_VALIDATORS[spec.type](spec)
+
+    # Otherwise, work out the list of steps that this parameter's value
+    # goes through.
+    steps: List[Validator] = []
+    # Check pattern against the value as given, before it's converted.  The
+    # pattern has to match the whole value.
+    regex = spec.pattern
+    if regex is not None:
+
+        def match_pattern(name: str, value: Any) -> Any:
+            # Values from path converters or JSON may not be strings
+            text = value if isinstance(value, str) else str(value)
+            if not regex.fullmatch(text):
                 raise BadRequest(
-                    f"The value for the '{name}' field did not look like a datetime"
+                    f"The value of the '{name}' field did not match the "
+                    f"pattern '{regex.pattern}'"
                 )
-        # We don't check any of the other formats here (yet).
+            return value
+        steps.append(match_pattern)
+
+    # Handle any Pythonic type conversions
+    if spec.type in _TYPE_CONVERSIONS:
+        steps.extend(_TYPE_CONVERSIONS[spec.type](spec))
 
     # Check enumeration
-    if hasattr(param, 'enum'):
-        if value not in param.enum:
-            raise ValueError(
-                f"The value for the '{name}' field is required to be one of"
-                "the following values:" + ', '.join(str(e) for e in param.enum)
-            )
+    enum_set = spec.enum_set
+    if spec.enum is not None and enum_set is not None:
+        # The name is only known when validating, but everything after it in
+        # the message can be put together now.
+        enum_suffix = (
+            "' field is required to be one of the following values: "
+            + ', '.join(map(str, spec.enum))
+        )
 
-    # Check pattern
-    if hasattr(param, 'pattern'):
-        regex = re.compile(param.pattern)
-        if not re.fullmatch(value):
-            raise ValueError(
-                f"The value '{value}' for parameter '{name}' did"
-                f"not match the pattern {param.pattern}"
-            )
+        def check_enum(name: str, value: Any) -> Any:
+            try:
+                found = value in enum_set
+            except TypeError:
+                # Unhashable values, e.g. lists from a JSON body, can't be
+                # in the enum.
+                found = False
+            if not found:
+                raise ValueError(f"The value for the '{name}" + enum_suffix)
+            return value
+        steps.append(check_enum)
+
+    if not steps:
+        return lambda name, value: value
+    if len(steps) == 1:
+        return steps[0]
 
-    # OK, validation has passed, return the value here
-    return value
+    def validate(name: str, value: Any) -> Any:
+        for step in steps:
+            value = step(name, value)
+        return value
 
+    return validate
 
-def value_of_param(param, request):
+
+def build_validator(param: Definition) -> Validator:
+    """
+    Return a function which validates a value for the given parameter, or
+    an item in a parameter, and returns the converted value.  The function
+    is called as `validator(name, value)`, where the name is used in any
+    error messages.
+
+    The parameter's type, format, pattern and enum are read into a ParamSpec
+    and inspected here, once, so the validator only does the checks that
+    apply to this parameter.  The validator is stored on the parameter
+    object, so later calls for the same parameter just return it.
+
+    Because of this, a parameter should not be changed once it has been used
+    to validate a value: the stored validator keeps using the definition it
+    was built from.  Create a new parameter instead.  A parameter that has
+    been used (by this or by value_of_param, which also stores how to get
+    its value from the request) also can't be pickled, since it holds
+    references to these functions.
+    """
+    validator = getattr(param, '_validator', None)
+    if validator is None:
+        validator = _build_validator(ParamSpec.from_param(param))
+        param._validator = validator
+    return validator
+
+
+# How to get the raw value of a parameter from the request, by where the
+# parameter is found.  Body parameters are described by a schema rather than
+# a type, so they can't be validated here.
+_EXTRACTORS: Dict[str, Extractor] = {
+    openapi.IN_PATH: lambda param, request: request.resolver_match.kwargs.get(param.name),
+    openapi.IN_QUERY: lambda param, request: request.query_params.get(param.name),
+    openapi.IN_FORM: lambda param, request: request.data.get(param.name),
+    openapi.IN_HEADER: lambda param, request: request.META.get(param.name),
+}
+
+
+def _extract_query_list(
+    param: openapi.Parameter, request: Request
+) -> Optional[List[str]]:
+    # Arrays in 'multi' format give each item as a separate query argument
+    return request.query_params.getlist(param.name) or None
+
+
+def _extract_form_list(
+    param: openapi.Parameter, request: Request
+) -> Optional[List[Any]]:
+    # Form-encoded data gives each item as a separate field, like the query.
+    data = request.data
+    if hasattr(data, 'getlist'):
+        return data.getlist(param.name) or None
+    # Other bodies, e.g. JSON, give the array as a list; a single value is
+    # treated as an array of one item rather than being split up.  As with
+    # the query, an empty array counts as the parameter not being given.
+    value = data.get(param.name)
+    if value is None or isinstance(value, list):
+        return value or None
+    return [value]
+
+
+# As for _EXTRACTORS, for array parameters in 'multi' collection format.
+# OpenAPI only allows this format in the query and in form data.
+_LIST_EXTRACTORS: Dict[str, Extractor] = {
+    openapi.IN_QUERY: _extract_query_list,
+    openapi.IN_FORM: _extract_form_list,
+}
+
+
+def _extractor_for(param: openapi.Parameter) -> Extractor:
+    """
+    Look up the function that gets the parameter's value from the request,
+    and store it on the parameter so the lookup only happens once.
+    """
+    if param.in_ not in _EXTRACTORS:
+        raise InvalidParameterDefinition(
+            f"Parameters in '{param.in_}' cannot be validated"
+        )
+    if getattr(param, 'collectionFormat', None) == 'multi':
+        if param.in_ not in _LIST_EXTRACTORS:
+            raise InvalidParameterDefinition(
+                f"Parameters in '{param.in_}' cannot use the 'multi' "
+                "collection format"
+            )
+        extractor = _LIST_EXTRACTORS[param.in_]
+    else:
+        extractor = _EXTRACTORS[param.in_]
+    param._extractor = extractor
+    return extractor
+
+
+def value_of_param(param: openapi.Parameter, request: Request) -> Any:
     """
     Return the value of the given parameter in the request.
 
@@ -129,22 +507,38 @@ def value_of_param(param, request):
 
     Validation of the parameter is also done.
     """
-    if param.in_ == openapi.IN_BODY:
-    if param.in_ == openapi.IN_PATH:
-    if param.in_ == openapi.IN_QUERY:
-        if param.name not in request.query_params:
-            return None
-        value = request.query_params[param.name]
-    if param.in_ == openapi.IN_FORM:
-    if param.in_ == openapi.IN_HEADER:
-        if param.name not in request.META:
-            return None
-        value = request.META[param.name]
+    extractor = getattr(param, '_extractor', None) or _extractor_for(param)
+    value = extractor(param, request)
+    if value is None:
+        return None
+    return build_validator(param)(param.name, value)
+
 
-    return _validate_part(param.name, param, value)
+def validate_all(
+    params: Iterable[openapi.Parameter], request: Request
+) -> Dict[str, Any]:
+    """
+    Return a dict of the values of all the given parameters in the request,
+    keyed on the parameter name.  This is the same as calling value_of_param
+    for each parameter, but saves the call overhead when a view takes many
+    parameters.
+
+    Parameters not found in the request have a value of None.
+    """
+    values = {}
+    for param in params:
+        extractor = getattr(param, '_extractor', None) or _extractor_for(param)
+        value = extractor(param, request)
+        if value is not None:
+            value = build_validator(param)(param.name, value)
+        values[param.name] = value
+    return values
 
 
-def filter_on_param(query_field, param, request, value_map=None):
+def filter_on_param(
+    query_field: str, param: openapi.Parameter, request: Request,
+    value_map: Optional[Dict[Any, Any]] = None,
+) -> Q:
     """
     Provide a Django Q object to filter on a field matching a given parameter,
     if it's found in the request.  If the parameter is not specified in the
@@ -183,11 +577,14 @@ def filter_on_param(query_field, param, request, value_map=None):
         param_value = value_map[param_value]
 
     if isinstance(param_value, list):
+        # An empty list, e.g. from a JSON body, doesn't change the queryset.
+        if not param_value:
+            return Q()
         # Queries such as 'tags__contains' can't use '__in', so we have to
         # OR a list of Q objects together.  Theoretically this isn't much
         # slower.
-        return Q(reduce(lambda l, r: l | r, (
-            Q(**{query_field: v})
-            for v in param_value
-        )))
+        query = Q(**{query_field: param_value[0]})
+        for value in param_value[1:]:
+            query |= Q(**{query_field: value})
+        return query
     return Q(**{query_field: param_value})
@@ -0,0 +1,12 @@
+import django
+from django.conf import settings
+
+
+def pytest_configure():
+    settings.configure(
+        USE_TZ=True,
+        TIME_ZONE='Australia/Sydney',
+        INSTALLED_APPS=['rest_framework', 'drf_yasg'],
+        ROOT_URLCONF='tests.urls',
+    )
+    django.setup()
@@ -0,0 +1,60 @@
+from datetime import datetime
+from django.core.exceptions import BadRequest
+from django.test import RequestFactory
+from django.utils import timezone
+from drf_yasg import openapi
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+import pytest
+
+from django_param_validator import build_validator, value_of_param
+
+
+@pytest.fixture
+def pytz_eastern():
+    pytz = pytest.importorskip('pytz')
+    tz = pytz.timezone('US/Eastern')
+    timezone.activate(tz)
+    yield tz
+    timezone.deactivate()
+
+
+def date_param(param_format):
+    return openapi.Parameter(
+        'when', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=param_format,
+    )
+
+
+def test_pytz_datetime(pytz_eastern):
+    result = build_validator(date_param(openapi.FORMAT_DATETIME))(
+        'when', '2020-07-01T10:00'
+    )
+    assert result == pytz_eastern.localize(datetime(2020, 7, 1, 10))
+
+
+@pytest.mark.parametrize('value', [
+    '2020-03-08T02:30',  # doesn't exist: clocks go forward
+    '2020-11-01T01:30',  # ambiguous: clocks go back
+])
+def test_pytz_invalid_local_time(pytz_eastern, value):
+    with pytest.raises(BadRequest):
+        build_validator(date_param(openapi.FORMAT_DATETIME))('when', value)
+
+
+@pytest.mark.parametrize('param_format, message', [
+    (openapi.FORMAT_DATE, "did not look like a date"),
+    (openapi.FORMAT_DATETIME, "did not look like a datetime"),
+])
+@pytest.mark.parametrize('value', [5, 2.5, ['2020-07-01'], {'day': 1}])
+def test_json_form_non_string(param_format, message, value):
+    param = openapi.Parameter(
+        'when', openapi.IN_FORM, type=openapi.TYPE_STRING, format=param_format,
+    )
+    request = Request(
+        RequestFactory().post(
+            '/things/', {'when': value}, content_type='application/json',
+        ),
+        parsers=[JSONParser()],
+    )
+    with pytest.raises(BadRequest, match=message):
+        value_of_param(param, request)
@@ -0,0 +1,56 @@
+from django.db.models import Q
+from django.test import RequestFactory
+from drf_yasg import openapi
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+import pytest
+
+from django_param_validator import filter_on_param
+
+
+def tags_param(collection_format='multi'):
+    return openapi.Parameter(
+        'tags', openapi.IN_FORM, type=openapi.TYPE_ARRAY,
+        items=openapi.Items(type=openapi.TYPE_STRING),
+        collection_format=collection_format,
+    )
+
+
+def json_request(data):
+    return Request(
+        RequestFactory().post('/things/', data, content_type='application/json'),
+        parsers=[JSONParser()],
+    )
+
+
+@pytest.mark.parametrize('tags, expected', [
+    (['a', 'b', 'c'], (
+        Q(tags__contains='a') | Q(tags__contains='b') | Q(tags__contains='c')
+    )),
+    (['a'], Q(tags__contains='a')),
+    ([], Q()),
+])
+def test_list(tags, expected):
+    request = json_request({'tags': tags})
+    assert filter_on_param('tags__contains', tags_param(), request) == expected
+
+
+def test_missing():
+    request = json_request({})
+    assert filter_on_param('tags__contains', tags_param(), request) == Q()
+
+
+def test_single_value():
+    param = openapi.Parameter('name', openapi.IN_QUERY, type=openapi.TYPE_STRING)
+    request = Request(RequestFactory().get('/things/?name=polly'))
+    assert filter_on_param('name', param, request) == Q(name='polly')
+
+
+def test_value_map():
+    param = openapi.Parameter(
+        'sort', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['age'],
+    )
+    request = Request(RequestFactory().get('/things/?sort=age'))
+    assert filter_on_param(
+        'order', param, request, value_map={'age': 'birth_date'}
+    ) == Q(order='birth_date')
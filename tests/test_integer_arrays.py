@@ -0,0 +1,127 @@
+"""
+Arrays of integers are validated in bulk with Numba when it's installed, and
+item by item in Python otherwise.  Both must give the same results and the
+same errors.
+"""
+
+from drf_yasg import openapi
+import pytest
+
+from django_param_validator import validator
+
+# The mypyc-compiled validator never uses Numba, and its functions can't be
+# patched to turn it off.
+pytestmark = pytest.mark.skipif(
+    not validator.__file__.endswith('.py'),
+    reason="validator is compiled by mypyc",
+)
+
+
+def python_only(monkeypatch):
+    monkeypatch.setattr(validator, '_integer_array_kernel', lambda: None)
+
+
+def with_numba(monkeypatch):
+    pytest.importorskip('numba')
+
+
+@pytest.fixture(params=[python_only, with_numba], ids=['python', 'numba'])
+def path(request, monkeypatch):
+    request.param(monkeypatch)
+    return request.param
+
+
+def array_param(collection_format='csv', enum=None):
+    return openapi.Parameter(
+        'ids', openapi.IN_QUERY, type=openapi.TYPE_ARRAY,
+        items=openapi.Items(type=openapi.TYPE_INTEGER, enum=enum),
+        collection_format=collection_format,
+    )
+
+
+def outcome(param, value):
+    """
+    The result of validating the value, or the type and message of the
+    exception raised.
+    """
+    try:
+        return validator.build_validator(param)('ids', value)
+    except Exception as e:
+        return type(e), str(e)
+
+
+def test_numba_path_is_used(monkeypatch):
+    with_numba(monkeypatch)
+    assert validator.build_validator(array_param()).__qualname__ == (
+        '_build_integer_array_validator.<locals>.validate_array'
+    )
+
+
+def test_python_path_is_used(monkeypatch):
+    python_only(monkeypatch)
+    assert validator.build_validator(array_param()).__qualname__ == (
+        '_build_array_validator.<locals>.<lambda>'
+    )
+
+
+@pytest.mark.parametrize('collection_format, value', [
+    ('csv', '1,2,3'),
+    ('ssv', '1 2 3'),
+    ('tsv', '1\t2\t3'),
+    ('pipes', '1|2|3'),
+])
+def test_well_formed(path, collection_format, value):
+    result = outcome(array_param(collection_format), value)
+    assert result == [1, 2, 3]
+    assert all(type(v) is int for v in result)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('-1,+2,3', [-1, 2, 3]),
+    ('-0,+0', [0, 0]),
+    ('999999999999999999', [999999999999999999]),
+    ('99999999999999999999,1', [99999999999999999999, 1]),
+    ('-99999999999999999999', [-99999999999999999999]),
+])
+def test_signed_and_long_values(path, value, expected):
+    assert outcome(array_param(), value) == expected
+
+
+@pytest.mark.parametrize('value', [
+    '', '1,,2', '1,', ',1', '1, 2', '1.5', 'x', '1,x', '--1', '1_000',
+])
+def test_malformed(path, value):
+    assert outcome(array_param(), value) == (
+        ValueError, "The value for the 'ids' field must be an integer"
+    )
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1,2,3', [1, 2, 3]),
+    ('-1,3', [-1, 3]),
+    ('1,4', (
+        ValueError,
+        "The value for the 'ids' field is required to be one of the "
+        "following values: 3, 1, 2, -1"
+    )),
+    ('99999999999999999999', (
+        ValueError,
+        "The value for the 'ids' field is required to be one of the "
+        "following values: 3, 1, 2, -1"
+    )),
+    ('1,x', (ValueError, "The value for the 'ids' field must be an integer")),
+])
+def test_enum(path, value, expected):
+    assert outcome(array_param(enum=[3, 1, 2, -1]), value) == expected
+
+
+@pytest.mark.parametrize('value', [
+    '1,2,3', '1,4', '-1,+2', '99999999999999999999', '', '1,,2', '1, 2', 'x',
+    '1180591620717411303424,1',
+])
+@pytest.mark.parametrize('enum', [None, [1, 2, 3], [], [2 ** 70, 1]])
+def test_paths_agree(monkeypatch, enum, value):
+    pytest.importorskip('numba')
+    numba_result = outcome(array_param(enum=enum), value)
+    python_only(monkeypatch)
+    assert outcome(array_param(enum=enum), value) == numba_result
@@ -0,0 +1,164 @@
+from django.core.exceptions import BadRequest
+from django.test import RequestFactory
+from django.urls import resolve
+from drf_yasg import openapi
+from rest_framework.parsers import FormParser, JSONParser
+from rest_framework.request import Request
+import pytest
+
+from django_param_validator import (
+    InvalidParameterDefinition, build_validator, validate_all, value_of_param,
+)
+
+
+def json_request(data):
+    return Request(
+        RequestFactory().post('/things/', data, content_type='application/json'),
+        parsers=[JSONParser()],
+    )
+
+
+def test_integer_path_parameter():
+    # The int converter has already turned the path parameter into an int
+    django_request = RequestFactory().get('/things/5/')
+    django_request.resolver_match = resolve('/things/5/')
+    param = openapi.Parameter('pk', openapi.IN_PATH, type=openapi.TYPE_INTEGER)
+    assert value_of_param(param, Request(django_request)) == 5
+
+
+@pytest.mark.parametrize('type_, value, expected', [
+    (openapi.TYPE_INTEGER, 3, 3),
+    (openapi.TYPE_INTEGER, '3', 3),
+    (openapi.TYPE_NUMBER, 3, 3.0),
+    (openapi.TYPE_NUMBER, 2.5, 2.5),
+])
+def test_json_form_parameter(type_, value, expected):
+    param = openapi.Parameter('count', openapi.IN_FORM, type=type_)
+    result = value_of_param(param, json_request({'count': value}))
+    assert result == expected
+    assert type(result) is type(expected)
+
+
+@pytest.mark.parametrize('type_, value', [
+    (openapi.TYPE_INTEGER, 2.5),
+    (openapi.TYPE_INTEGER, True),
+    (openapi.TYPE_INTEGER, [1]),
+    (openapi.TYPE_NUMBER, False),
+    (openapi.TYPE_NUMBER, {'a': 1}),
+])
+def test_json_form_parameter_wrong_type(type_, value):
+    param = openapi.Parameter('count', openapi.IN_FORM, type=type_)
+    with pytest.raises(ValueError):
+        value_of_param(param, json_request({'count': value}))
+
+
+@pytest.mark.parametrize('value', [5, '5'])
+def test_pattern_on_non_string(value):
+    param = openapi.Parameter(
+        'pk', openapi.IN_PATH, type=openapi.TYPE_STRING, pattern=r'\d+',
+    )
+    assert build_validator(param)('pk', value) == value
+
+
+def test_pattern_mismatch_on_non_string():
+    param = openapi.Parameter(
+        'pk', openapi.IN_PATH, type=openapi.TYPE_STRING, pattern=r'[a-z]+',
+    )
+    with pytest.raises(BadRequest):
+        build_validator(param)('pk', 5)
+
+
+def multi_param(in_):
+    return openapi.Parameter(
+        'tags', in_, type=openapi.TYPE_ARRAY,
+        items=openapi.Items(type=openapi.TYPE_STRING),
+        collection_format='multi',
+    )
+
+
+def test_multi_query_parameter():
+    request = Request(RequestFactory().get('/things/?tags=ab&tags=cd'))
+    assert value_of_param(multi_param(openapi.IN_QUERY), request) == ['ab', 'cd']
+
+
+def test_multi_form_parameter():
+    request = Request(
+        RequestFactory().post(
+            '/things/', 'tags=ab&tags=cd',
+            content_type='application/x-www-form-urlencoded',
+        ),
+        parsers=[FormParser()],
+    )
+    assert value_of_param(multi_param(openapi.IN_FORM), request) == ['ab', 'cd']
+
+
+@pytest.mark.parametrize('tags, expected', [
+    (['ab', 'cd'], ['ab', 'cd']),
+    ('ab', ['ab']),
+])
+def test_multi_json_form_parameter(tags, expected):
+    request = json_request({'tags': tags})
+    assert value_of_param(multi_param(openapi.IN_FORM), request) == expected
+
+
+def test_multi_header_parameter():
+    request = Request(RequestFactory().get('/things/'))
+    with pytest.raises(InvalidParameterDefinition):
+        value_of_param(multi_param(openapi.IN_HEADER), request)
+
+
+@pytest.mark.parametrize('value, expected', [
+    (True, True), (False, False), ('true', True), ('no', False), ([1], False),
+])
+def test_json_form_boolean(value, expected):
+    param = openapi.Parameter('flag', openapi.IN_FORM, type=openapi.TYPE_BOOLEAN)
+    assert value_of_param(param, json_request({'flag': value})) is expected
+
+
+@pytest.mark.parametrize('value', [['a'], {'x': 1}, 'c'])
+def test_json_form_enum_rejected(value):
+    param = openapi.Parameter(
+        's', openapi.IN_FORM, type=openapi.TYPE_STRING, enum=['a', 'b'],
+    )
+    with pytest.raises(ValueError, match="one of the following values: a, b"):
+        value_of_param(param, json_request({'s': value}))
+
+
+def test_multi_json_form_parameter_empty():
+    request = json_request({'tags': []})
+    assert value_of_param(multi_param(openapi.IN_FORM), request) is None
+
+
+def test_validate_all():
+    params = [
+        openapi.Parameter('count', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        openapi.Parameter('flag', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN),
+        openapi.Parameter('name', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+        openapi.Parameter(
+            'ids', openapi.IN_QUERY, type=openapi.TYPE_ARRAY,
+            items=openapi.Items(type=openapi.TYPE_INTEGER),
+            collection_format='csv',
+        ),
+        multi_param(openapi.IN_QUERY),
+        openapi.Parameter('X-Missing', openapi.IN_HEADER, type=openapi.TYPE_STRING),
+    ]
+    request = Request(RequestFactory().get(
+        '/things/?count=3&flag=yes&ids=1,2&tags=ab&tags=cd'
+    ))
+    assert validate_all(params, request) == {
+        'count': 3,
+        'flag': True,
+        'name': None,
+        'ids': [1, 2],
+        'tags': ['ab', 'cd'],
+        'X-Missing': None,
+    }
+
+
+def test_validate_all_invalid():
+    params = [
+        openapi.Parameter('count', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+    ]
+    request = Request(RequestFactory().get('/things/?count=x'))
+    with pytest.raises(ValueError):
+        validate_all(params, request)
@@ -0,0 +1,5 @@
+from django.urls import path
+
+urlpatterns = [
+    path('things/<int:pk>/', lambda request, pk: None),
+]